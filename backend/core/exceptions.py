@@ -0,0 +1,27 @@
+import logging
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import exception_handler as drf_exception_handler
+
+logger = logging.getLogger(__name__)
+
+
+def api_exception_handler(exc, context):
+    """
+    DRF exception hook preserving this API's {'error': ...} envelope
+
+    Expected API exceptions (validation errors, 404s, throttles) pass
+    through DRF's default handling; anything unexpected is logged with its
+    traceback and surfaced as a 500 in the same JSON shape the views used
+    to assemble inline.
+    """
+    response = drf_exception_handler(exc, context)
+    if response is not None:
+        return response
+
+    logger.exception('Unhandled error in %s', context.get('view'), exc_info=exc)
+    return Response(
+        {'error': str(exc)},
+        status=status.HTTP_500_INTERNAL_SERVER_ERROR
+    )
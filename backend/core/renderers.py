@@ -0,0 +1,25 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson when installed
+
+    orjson serializes straight to bytes in C (roughly 3x faster than the
+    stdlib json module) and natively encodes UUIDs and datetimes, which
+    dominate this API's list payloads. Falls back to DRF's stock renderer
+    when the package is unavailable or an indented (browsable) rendering
+    is requested.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=str)
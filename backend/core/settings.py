@@ -139,6 +139,11 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny'
     ],
+    'EXCEPTION_HANDLER': 'core.exceptions.api_exception_handler',
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
         'rest_framework.parsers.MultiPartParser',
@@ -146,6 +151,17 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Cache backend (per-process locmem; swap LOCATION/BACKEND for Redis to
+# share cached stats across workers)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# How long the StorageStats singleton may be served from cache (seconds)
+STORAGE_STATS_CACHE_TIMEOUT = int(os.environ.get('STORAGE_STATS_CACHE_TIMEOUT', '60'))
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True  # Configure appropriately in production
 CORS_ALLOW_CREDENTIALS = True
@@ -1,6 +1,25 @@
+import hashlib
+import ssl
+import warnings
+
 from django.apps import AppConfig
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models.signals import post_migrate
 
 
 class FilesConfig(AppConfig):
   default_auto_field = "django.db.models.BigAutoField"
   name = "files"
+
+  def ready(self):
+    """Verify the hashing backend used for deduplication at startup"""
+    from . import fts
+    post_migrate.connect(fts.ensure_fts_schema, sender=self)
+
+    if 'sha256' not in hashlib.algorithms_available:
+      raise ImproperlyConfigured("hashlib does not provide a SHA-256 backend")
+    if ssl.OPENSSL_VERSION_INFO < (1, 1, 1):
+      warnings.warn(
+        f"OpenSSL {ssl.OPENSSL_VERSION} is older than 1.1.1; "
+        "hardware-accelerated SHA-256 may not be available"
+      )
@@ -0,0 +1,134 @@
+"""
+SQLite FTS5 support for filename search.
+
+A virtual table shadows files_filereference and is kept in sync by triggers,
+so filename searches can use tokenized MATCH queries instead of unindexable
+LIKE '%query%' full scans. The schema is created after migrate (the table
+lives outside Django's model layer, matching how the rest of the schema is
+generated at startup) and everything degrades gracefully to LIKE when FTS5
+is unavailable.
+"""
+import re
+
+from django.db import connection
+
+# Queries with FTS5 operator characters fall back to LIKE
+_SIMPLE_QUERY_RE = re.compile(r'^[\w\s.\-]+$')
+
+FTS_TABLE = 'filereferences_fts'
+
+FTS_SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        original_filename,
+        content='files_filereference',
+        content_rowid='rowid'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON files_filereference BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, original_filename)
+        VALUES (new.rowid, new.original_filename);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON files_filereference BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, original_filename)
+        VALUES ('delete', old.rowid, old.original_filename);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON files_filereference BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, original_filename)
+        VALUES ('delete', old.rowid, old.original_filename);
+        INSERT INTO {FTS_TABLE}(rowid, original_filename)
+        VALUES (new.rowid, new.original_filename);
+    END
+    """,
+]
+
+_fts_available = None
+
+
+def _probe_fts_table():
+    """
+    Check whether the FTS table exists on this connection
+
+    Serving workers never run post_migrate (start.sh migrates in a separate
+    process), so availability is resolved lazily on the first search in
+    each worker rather than only by ensure_fts_schema.
+    """
+    if connection.vendor != 'sqlite':
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name=%s",
+                [FTS_TABLE]
+            )
+            return cursor.fetchone() is not None
+    except Exception:
+        return False
+
+
+def ensure_fts_schema(sender=None, **kwargs):
+    """
+    Create the FTS5 table and sync triggers (idempotent, post_migrate hook)
+    """
+    global _fts_available
+
+    if connection.vendor != 'sqlite':
+        _fts_available = False
+        return
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name=%s",
+                [FTS_TABLE]
+            )
+            existed = cursor.fetchone() is not None
+
+            for statement in FTS_SCHEMA:
+                cursor.execute(statement)
+
+            if not existed:
+                # Backfill the index from rows created before the table
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+                )
+        _fts_available = True
+    except Exception:
+        # FTS5 not compiled into this SQLite build - search falls back to LIKE
+        _fts_available = False
+
+
+def fts_filter(queryset, query):
+    """
+    Filter a FileReference queryset with an FTS5 prefix MATCH
+
+    Args:
+        queryset: FileReference queryset to filter
+        query (str): Raw search query
+
+    Returns:
+        QuerySet filtered via the FTS index, or None when the caller should
+        fall back to a LIKE filter
+    """
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = _probe_fts_table()
+    if not _fts_available or not _SIMPLE_QUERY_RE.match(query):
+        return None
+
+    # Quote the query as a single prefix phrase so filenames with dots or
+    # dashes tokenize safely
+    match = '"%s"*' % query.replace('"', '""')
+
+    return queryset.extra(
+        where=[
+            '"files_filereference"."rowid" IN '
+            f'(SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)'
+        ],
+        params=[match],
+    )
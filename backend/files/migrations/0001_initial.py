@@ -0,0 +1,142 @@
+# Generated by Django 4.2.30 on 2026-08-31 05:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+import files.models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='File',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file', models.FileField(upload_to=files.models.file_upload_path)),
+                ('file_hash', models.CharField(db_index=True, max_length=64, unique=True)),
+                ('file_type', models.CharField(db_index=True, max_length=100)),
+                ('size', models.BigIntegerField(db_index=True)),
+                ('reference_count', models.PositiveIntegerField(db_index=True, default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StorageStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_files_uploaded', models.PositiveIntegerField(default=0)),
+                ('unique_files_stored', models.PositiveIntegerField(default=0)),
+                ('total_size_uploaded', models.BigIntegerField(default=0)),
+                ('actual_size_stored', models.BigIntegerField(default=0)),
+                ('storage_saved', models.BigIntegerField(default=0)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Storage Statistics',
+                'verbose_name_plural': 'Storage Statistics',
+            },
+        ),
+        migrations.CreateModel(
+            name='FileReference',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('original_filename', models.CharField(db_index=True, max_length=255)),
+                ('uploaded_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('is_duplicate', models.BooleanField(db_index=True, default=False)),
+                ('filename_normalized', models.CharField(blank=True, db_index=True, max_length=255)),
+                ('file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='references', to='files.file')),
+            ],
+            options={
+                'ordering': ['-uploaded_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['file_hash'], name='files_file_hash_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['file_type'], name='files_file_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['size'], name='files_size_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['created_at'], name='files_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['reference_count'], name='files_ref_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['file_type', 'size'], name='files_type_size_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['file_type', '-created_at'], name='files_type_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['size', '-created_at'], name='files_size_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['reference_count', '-created_at'], name='files_refs_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['-reference_count', '-created_at'], name='files_most_refs_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['file_type', '-reference_count'], name='files_type_refs_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='filereference',
+            index=models.Index(fields=['original_filename'], name='filerefs_filename_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='filereference',
+            index=models.Index(fields=['uploaded_at'], name='filerefs_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='filereference',
+            index=models.Index(fields=['is_duplicate'], name='filerefs_duplicate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='filereference',
+            index=models.Index(fields=['filename_normalized'], name='filerefs_norm_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='filereference',
+            index=models.Index(fields=['is_duplicate', '-uploaded_at'], name='filerefs_dup_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='filereference',
+            index=models.Index(fields=['original_filename', '-uploaded_at'], name='filerefs_name_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='filereference',
+            index=models.Index(fields=['filename_normalized', '-uploaded_at'], name='filerefs_norm_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='filereference',
+            index=models.Index(fields=['file', '-uploaded_at'], name='filerefs_file_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='filereference',
+            index=models.Index(fields=['file', 'is_duplicate'], name='filerefs_file_dup_idx'),
+        ),
+    ]
@@ -0,0 +1,211 @@
+# Incremental upgrade from the original schema. Existing rows stay valid:
+# the old file_type strings are carried into the new MimeType lookup table
+# before the legacy column is dropped, and pre-existing hashes keep the
+# 'sha256' algorithm tag they were computed with.
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+import django.db.models.functions.text
+
+
+def _populate_mime_types(apps, schema_editor):
+    """Create MimeType rows from the legacy strings and link files to them"""
+    File = apps.get_model('files', 'File')
+    MimeType = apps.get_model('files', 'MimeType')
+    names = File.objects.values_list(
+        'file_type_legacy', flat=True
+    ).distinct()
+    for name in names:
+        mime_type, _ = MimeType.objects.get_or_create(name=name)
+        File.objects.filter(file_type_legacy=name).update(
+            file_type_id=mime_type.id
+        )
+
+
+def _restore_mime_strings(apps, schema_editor):
+    """Copy MimeType names back into the legacy string column"""
+    File = apps.get_model('files', 'File')
+    MimeType = apps.get_model('files', 'MimeType')
+    File.objects.update(
+        file_type_legacy=Subquery(
+            MimeType.objects.filter(pk=OuterRef('file_type_id')).values('name')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MimeType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+
+        # Drop the single-field indexes superseded by compound/partial ones,
+        # plus everything referencing the columns replaced below
+        migrations.RemoveIndex(
+            model_name='file',
+            name='files_file_hash_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='file',
+            name='files_file_type_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='file',
+            name='files_size_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='file',
+            name='files_ref_count_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='file',
+            name='files_most_refs_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='file',
+            name='files_type_size_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='file',
+            name='files_type_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='file',
+            name='files_type_refs_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='filereference',
+            name='filerefs_filename_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='filereference',
+            name='filerefs_duplicate_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='filereference',
+            name='filerefs_norm_name_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='filereference',
+            name='filerefs_dup_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='filereference',
+            name='filerefs_norm_date_idx',
+        ),
+        migrations.RemoveField(
+            model_name='filereference',
+            name='filename_normalized',
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='file_hash_algo',
+            field=models.CharField(default='sha256', max_length=32),
+        ),
+
+        # Swap the file_type string for a MimeType FK without losing data:
+        # keep the old column under a temporary name, add the FK nullable,
+        # backfill, then drop the legacy column and tighten to NOT NULL
+        migrations.RenameField(
+            model_name='file',
+            old_name='file_type',
+            new_name='file_type_legacy',
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='file_type',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='files', to='files.mimetype'),
+        ),
+        migrations.RunPython(_populate_mime_types, _restore_mime_strings),
+        # Default the legacy column before dropping it so the reverse
+        # migration can re-add it to populated tables
+        migrations.AlterField(
+            model_name='file',
+            name='file_type_legacy',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.RemoveField(
+            model_name='file',
+            name='file_type_legacy',
+        ),
+        migrations.AlterField(
+            model_name='file',
+            name='file_type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='files', to='files.mimetype'),
+        ),
+
+        # Per-field db_index flags dropped in favour of the Meta indexes
+        migrations.AlterField(
+            model_name='file',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name='file',
+            name='file_hash',
+            field=models.CharField(max_length=64, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='file',
+            name='reference_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='file',
+            name='size',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='filereference',
+            name='is_duplicate',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='filereference',
+            name='original_filename',
+            field=models.CharField(max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='filereference',
+            name='uploaded_at',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['file_type', 'size'], name='files_type_size_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['file_type', '-created_at'], name='files_type_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['file_type', '-reference_count'], name='files_type_refs_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(condition=models.Q(('reference_count__gt', 1)), fields=['-reference_count'], name='files_refcnt_desc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='filereference',
+            index=models.Index(condition=models.Q(('is_duplicate', True)), fields=['-uploaded_at'], name='filerefs_dup_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='filereference',
+            index=models.Index(django.db.models.functions.text.Lower('original_filename'), name='filerefs_lower_name_idx'),
+        ),
+    ]
@@ -1,9 +1,27 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 from .models import File, FileReference, StorageStats
 
+
+@lru_cache(maxsize=4096)
+def _storage_url(name):
+    """Relative URL for a stored file path
+
+    storage.url() is deterministic for a given path on the local-filesystem
+    backend, so cache it instead of re-quoting the path (and constructing
+    FieldFile machinery) for every serialized row.
+    """
+    return default_storage.url(name)
+
 class FileSerializer(serializers.ModelSerializer):
     """Serializer for the File model (physical files)"""
-    
+
+    # Expose the normalized MIME type as its string name
+    file_type = serializers.CharField(source='file_type.name', read_only=True)
+
     class Meta:
         model = File
         fields = [
@@ -18,7 +36,7 @@ class FileReferenceSerializer(serializers.ModelSerializer):
     # Include file details
     file_url = serializers.SerializerMethodField()
     file_hash = serializers.CharField(source='file.file_hash', read_only=True)
-    file_type = serializers.CharField(source='file.file_type', read_only=True)
+    file_type = serializers.CharField(source='file.file_type.name', read_only=True)
     size = serializers.IntegerField(source='file.size', read_only=True)
     reference_count = serializers.IntegerField(source='file.reference_count', read_only=True)
     
@@ -33,27 +51,72 @@ class FileReferenceSerializer(serializers.ModelSerializer):
             'file_hash', 'file_type', 'size', 'reference_count'
         ]
     
+    # Subclasses reading flat annotations don't need the cached file row
+    requires_file_cache = True
+
+    def to_representation(self, instance):
+        if settings.DEBUG and self.requires_file_cache:
+            # Catch N+1 regressions early: the physical file must have been
+            # eagerly loaded (select_related) by whoever built the queryset
+            assert 'file' in instance._state.fields_cache, (
+                'FileReferenceSerializer requires a select_related("file") queryset'
+            )
+        return super().to_representation(instance)
+
     def get_file_url(self, obj):
         """Get the file URL"""
+        name = obj.file.file.name
+        if not name:
+            return None
+        return self._absolute_uri(_storage_url(name))
+
+    def _absolute_uri(self, path):
+        """Prefix with the per-request base URI, avoiding build_absolute_uri per row"""
+        base_uri = self.context.get('base_uri')
+        if base_uri is not None:
+            return base_uri + path
         request = self.context.get('request')
-        if obj.file.file and request:
-            return request.build_absolute_uri(obj.file.file.url)
+        if request is not None:
+            return request.build_absolute_uri(path)
         return None
 
+class FileReferenceListSerializer(FileReferenceSerializer):
+    """
+    Serializer for annotated list querysets (FileReferenceManager.with_file_fields)
+
+    Reads the flat annotated columns directly, so no related File instances
+    are materialized and no per-row attribute traversal happens.
+    """
+
+    file_hash = serializers.CharField(read_only=True)
+    file_type = serializers.CharField(read_only=True)
+    size = serializers.IntegerField(read_only=True)
+    reference_count = serializers.IntegerField(read_only=True)
+
+    requires_file_cache = False
+
+    def get_file_url(self, obj):
+        """Build the file URL from the annotated storage path"""
+        if not obj.file_path:
+            return None
+        return self._absolute_uri(_storage_url(obj.file_path))
+
+# Maximum upload size (10MB as mentioned in README)
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+
+
 class FileUploadSerializer(serializers.Serializer):
     """Serializer for file upload requests"""
-    
+
     file = serializers.FileField()
-    
+
     def validate_file(self, value):
         """Validate uploaded file"""
-        # Check file size (max 10MB as mentioned in README)
-        max_size = 10 * 1024 * 1024  # 10MB
-        if value.size > max_size:
+        if value.size > MAX_UPLOAD_SIZE:
             raise serializers.ValidationError(
-                f"File size {value.size} bytes exceeds maximum allowed size of {max_size} bytes"
+                f"File size {value.size} bytes exceeds maximum allowed size of {MAX_UPLOAD_SIZE} bytes"
             )
-        
+
         return value
 
 class FileUploadResponseSerializer(serializers.Serializer):
@@ -65,16 +128,22 @@ class FileUploadResponseSerializer(serializers.Serializer):
     message = serializers.CharField(read_only=True)
 
 class StorageStatsSerializer(serializers.ModelSerializer):
-    """Serializer for storage statistics"""
-    
-    savings_percentage = serializers.SerializerMethodField()
-    deduplication_ratio = serializers.SerializerMethodField()
-    
+    """
+    Serializer for storage statistics
+
+    The derived fields read annotations computed in the database
+    (StorageStatsManager.with_derived_metrics) rather than per-response
+    Python arithmetic.
+    """
+
+    savings_percentage = serializers.FloatField(read_only=True)
+    deduplication_ratio = serializers.FloatField(read_only=True)
+
     # Formatted size fields for better readability
-    total_size_uploaded_mb = serializers.SerializerMethodField()
-    actual_size_stored_mb = serializers.SerializerMethodField()
-    storage_saved_mb = serializers.SerializerMethodField()
-    
+    total_size_uploaded_mb = serializers.FloatField(read_only=True)
+    actual_size_stored_mb = serializers.FloatField(read_only=True)
+    storage_saved_mb = serializers.FloatField(read_only=True)
+
     class Meta:
         model = StorageStats
         fields = [
@@ -90,28 +159,6 @@ class StorageStatsSerializer(serializers.ModelSerializer):
             'savings_percentage', 'deduplication_ratio', 'last_updated'
         ]
     
-    def get_savings_percentage(self, obj):
-        """Calculate storage savings percentage"""
-        return round(obj.calculate_savings_percentage(), 2)
-    
-    def get_deduplication_ratio(self, obj):
-        """Calculate deduplication ratio"""
-        if obj.unique_files_stored > 0:
-            return round(obj.total_files_uploaded / obj.unique_files_stored, 2)
-        return 0
-    
-    def get_total_size_uploaded_mb(self, obj):
-        """Convert bytes to MB"""
-        return round(obj.total_size_uploaded / (1024 * 1024), 2)
-    
-    def get_actual_size_stored_mb(self, obj):
-        """Convert bytes to MB"""
-        return round(obj.actual_size_stored / (1024 * 1024), 2)
-    
-    def get_storage_saved_mb(self, obj):
-        """Convert bytes to MB"""
-        return round(obj.storage_saved / (1024 * 1024), 2)
-
 class FileSearchSerializer(serializers.Serializer):
     """Serializer for file search parameters"""
     
@@ -169,16 +216,19 @@ class BulkDeleteSerializer(serializers.Serializer):
     
     def validate_reference_ids(self, value):
         """Validate that reference IDs exist"""
-        existing_ids = set(
-            FileReference.objects.filter(id__in=value).values_list('id', flat=True)
-        )
-        invalid_ids = set(value) - existing_ids
-        
-        if invalid_ids:
+        # Happy path is a single COUNT(*); only fetch the IDs back when we
+        # need to report which ones were invalid
+        existing_count = FileReference.objects.filter(id__in=value).count()
+
+        if existing_count != len(set(value)):
+            existing_ids = set(
+                FileReference.objects.filter(id__in=value).values_list('id', flat=True)
+            )
+            invalid_ids = set(value) - existing_ids
             raise serializers.ValidationError(
                 f"Invalid reference IDs: {[str(id) for id in invalid_ids]}"
             )
-        
+
         return value
 
 class BulkDeleteResponseSerializer(serializers.Serializer):
@@ -209,23 +259,7 @@ class FileTypeStatsSerializer(serializers.Serializer):
     total_size = serializers.IntegerField()
     total_references = serializers.IntegerField()
     
-    # Formatted fields
-    total_size_mb = serializers.SerializerMethodField()
-    average_file_size = serializers.SerializerMethodField()
-    deduplication_ratio = serializers.SerializerMethodField()
-    
-    def get_total_size_mb(self, obj):
-        """Convert bytes to MB"""
-        return round(obj['total_size'] / (1024 * 1024), 2)
-    
-    def get_average_file_size(self, obj):
-        """Calculate average file size"""
-        if obj['count'] > 0:
-            return round(obj['total_size'] / obj['count'])
-        return 0
-    
-    def get_deduplication_ratio(self, obj):
-        """Calculate deduplication ratio for this file type"""
-        if obj['count'] > 0:
-            return round(obj['total_references'] / obj['count'], 2)
-        return 0 
\ No newline at end of file
+    # Formatted fields, annotated in the database by FileManager.by_file_type
+    total_size_mb = serializers.FloatField(read_only=True)
+    average_file_size = serializers.FloatField(read_only=True)
+    deduplication_ratio = serializers.FloatField(read_only=True)
\ No newline at end of file
@@ -2,44 +2,98 @@ from django.shortcuts import render
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
-from django.http import Http404
-from django.db.models import Sum, Count, Q
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from django.core.cache import cache
+from django.http import FileResponse, Http404
 
-from .models import File, FileReference, StorageStats
+from .models import File, FileReference, StorageStats, FILTER_PARAM_KEYS
 from .serializers import (
-    FileSerializer, FileReferenceSerializer, FileUploadSerializer,
-    FileUploadResponseSerializer, StorageStatsSerializer, FileSearchSerializer,
-    BulkDeleteSerializer, BulkDeleteResponseSerializer, DetailedStatsSerializer,
-    FileTypeStatsSerializer
+    FileSerializer, FileReferenceSerializer, FileReferenceListSerializer,
+    FileUploadSerializer, FileUploadResponseSerializer, StorageStatsSerializer,
+    FileSearchSerializer, BulkDeleteSerializer, BulkDeleteResponseSerializer,
+    DetailedStatsSerializer, FileTypeStatsSerializer
 )
-from .services import DeduplicationService, FileSearchService
+from .services import DeduplicationService, FileSearchService, analytics_cache_key
 
 # Create your views here.
 
+# Query params that actually engage the search pipeline - pagination-only
+# requests (?page=2, ?cursor=...) skip validation and filtering entirely
+SEARCH_QUERY_PARAMS = frozenset(FILTER_PARAM_KEYS | {'sort_by'})
+
 class FilePagination(PageNumberPagination):
     """Custom pagination for file listings"""
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+class FileCursorPagination(CursorPagination):
+    """
+    Keyset pagination for deep file listings
+
+    Seeks on the indexed (uploaded_at, id) tuple instead of OFFSET, so page
+    cost stays constant no matter how deep the client pages. Clients opt in
+    by sending a 'cursor' query parameter (empty for the first page).
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-uploaded_at', '-id')
+
 class FileReferenceViewSet(viewsets.ModelViewSet):
     """
     ViewSet for managing file references (user uploads)
     """
-    queryset = FileReference.objects.select_related('file').all()
+    # Project only the columns the serializers and deletion path touch -
+    # keeps rows narrow and skips constructing unused field attributes
+    queryset = FileReference.objects.select_related('file', 'file__file_type').only(
+        'id', 'original_filename', 'uploaded_at', 'is_duplicate',
+        'file__id', 'file__file', 'file__file_hash', 'file__file_type__name',
+        'file__size', 'file__reference_count'
+    )
     serializer_class = FileReferenceSerializer
     pagination_class = FilePagination
-    
+
+    @property
+    def paginator(self):
+        """Use keyset pagination when the client sends a cursor"""
+        if not hasattr(self, '_paginator'):
+            if 'cursor' in self.request.query_params:
+                self._paginator = FileCursorPagination()
+            else:
+                self._paginator = FilePagination()
+        return self._paginator
+
+    def get_serializer_context(self):
+        """Compute the absolute URI base once per request
+
+        Serializers concatenate base_uri + file URL per row instead of
+        running request.build_absolute_uri for every object.
+        """
+        context = super().get_serializer_context()
+        if self.request is not None:
+            context['base_uri'] = self.request.build_absolute_uri('/')[:-1]
+        return context
+
+    def get_serializer_class(self):
+        """List-style responses run on annotated querysets with flat columns"""
+        if self.action in ('list', 'search', 'duplicates'):
+            return FileReferenceListSerializer
+        return super().get_serializer_class()
+
     def get_queryset(self):
         """Get queryset with optional search/filtering"""
-        queryset = super().get_queryset()
-        
-        # Apply search and filters if any query parameters are present
-        if self.request.query_params:
-            queryset = FileSearchService.search_files(self.request.query_params)
-        
-        return queryset
+        # Apply search and filters only when a search/filter/sort parameter
+        # is actually present, validating them once into typed values
+        if SEARCH_QUERY_PARAMS.intersection(self.request.query_params):
+            search_serializer = FileSearchSerializer(data=self.request.query_params)
+            search_serializer.is_valid(raise_exception=True)
+            return FileSearchService.search_files(search_serializer.validated_data)
+
+        if self.action == 'list':
+            return FileReference.objects.with_file_fields()
+
+        return super().get_queryset()
 
     def create(self, request, *args, **kwargs):
         """
@@ -52,111 +106,143 @@ class FileReferenceViewSet(viewsets.ModelViewSet):
         uploaded_file = upload_serializer.validated_data['file']
         original_filename = uploaded_file.name
         
-        try:
-            # Handle file upload with deduplication
-            file_reference, is_duplicate, storage_saved = DeduplicationService.handle_file_upload(
-                uploaded_file, original_filename
-            )
+        # Handle file upload with deduplication
+        file_reference, is_duplicate, storage_saved = DeduplicationService.handle_file_upload(
+            uploaded_file, original_filename
+        )
             
-            # Prepare response
-            response_data = {
-                'file_reference': file_reference,
-                'is_duplicate': is_duplicate,
-                'storage_saved': storage_saved,
-                'message': 'File uploaded successfully'
-            }
+        # Prepare response
+        response_data = {
+            'file_reference': file_reference,
+            'is_duplicate': is_duplicate,
+            'storage_saved': storage_saved,
+            'message': 'File uploaded successfully'
+        }
             
-            if is_duplicate:
-                response_data['message'] = f'Duplicate file detected. Storage saved: {storage_saved} bytes'
+        if is_duplicate:
+            response_data['message'] = f'Duplicate file detected. Storage saved: {storage_saved} bytes'
             
-            # Serialize the response
-            response_serializer = FileUploadResponseSerializer(
-                response_data, 
-                context={'request': request}
-            )
+        # Serialize the response
+        response_serializer = FileUploadResponseSerializer(
+            response_data, 
+            context={'request': request}
+        )
             
-            return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+        return Response(response_serializer.data, status=status.HTTP_201_CREATED)
             
-        except Exception as e:
-            return Response(
-                {'error': f'File upload failed: {str(e)}'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
 
     def destroy(self, request, *args, **kwargs):
         """
         Delete a file reference with reference counting
         """
-        try:
-            file_reference = self.get_object()
-            deletion_info = DeduplicationService.handle_file_deletion(file_reference)
+        file_reference = self.get_object()
+        deletion_info = DeduplicationService.handle_file_deletion(file_reference)
             
-            return Response({
-                'message': 'File reference deleted successfully',
-                'file_deleted': deletion_info['file_deleted'],
-                'storage_freed': deletion_info['storage_freed'],
-                'references_remaining': deletion_info['references_remaining']
-            }, status=status.HTTP_200_OK)
+        return Response({
+            'message': 'File reference deleted successfully',
+            'file_deleted': deletion_info['file_deleted'],
+            'storage_freed': deletion_info['storage_freed'],
+            'references_remaining': deletion_info['references_remaining']
+        }, status=status.HTTP_200_OK)
             
-        except Exception as e:
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """
+        Stream the file content without user-space copies
+
+        FileResponse hands the open file to the WSGI server's file_wrapper,
+        which uses sendfile() where available, so bytes flow kernel-to-socket
+        instead of being read and rewritten through Python.
+        """
+        file_reference = self.get_object()
+        try:
+            return FileResponse(
+                file_reference.file.file.open('rb'),
+                as_attachment=True,
+                filename=file_reference.original_filename,
+                content_type=file_reference.file.file_type.name
+            )
+        except (FileNotFoundError, ValueError):
+            raise Http404('File content not available')
+
+    @action(detail=False, methods=['post'])
+    def bulk_upload(self, request):
+        """
+        Upload multiple files in one request with batched deduplication
+        """
+        uploaded_files = request.FILES.getlist('files')
+        if not uploaded_files:
             return Response(
-                {'error': f'File deletion failed: {str(e)}'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': 'No files provided. Send one or more "files" parts.'},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
+        # Validate each file with the same rules as single upload
+        for uploaded_file in uploaded_files:
+            upload_serializer = FileUploadSerializer(data={'file': uploaded_file})
+            upload_serializer.is_valid(raise_exception=True)
+
+        results = DeduplicationService.handle_file_upload_bulk(uploaded_files)
+
+        response_serializer = FileUploadResponseSerializer(
+            [
+                {
+                    'file_reference': file_reference,
+                    'is_duplicate': is_duplicate,
+                    'storage_saved': storage_saved,
+                    'message': (
+                        f'Duplicate file detected. Storage saved: {storage_saved} bytes'
+                        if is_duplicate else 'File uploaded successfully'
+                    )
+                }
+                for file_reference, is_duplicate, storage_saved in results
+            ],
+            many=True,
+            context=self.get_serializer_context()
+        )
+        return Response(
+            {'results': response_serializer.data},
+            status=status.HTTP_201_CREATED
+        )
+
+
     @action(detail=False, methods=['post'])
     def bulk_delete(self, request):
         """
         Bulk delete multiple file references
         """
-        try:
-            # Validate the request data
-            bulk_delete_serializer = BulkDeleteSerializer(data=request.data)
-            bulk_delete_serializer.is_valid(raise_exception=True)
-            
-            reference_ids = bulk_delete_serializer.validated_data['reference_ids']
-            references = FileReference.objects.filter(id__in=reference_ids)
+        # Validate the request data
+        bulk_delete_serializer = BulkDeleteSerializer(data=request.data)
+        bulk_delete_serializer.is_valid(raise_exception=True)
             
-            deletion_results = []
-            total_storage_freed = 0
-            
-            for reference in references:
-                deletion_info = DeduplicationService.handle_file_deletion(reference)
-                deletion_results.append({
-                    'reference_id': str(reference.id),
-                    'original_filename': reference.original_filename,
-                    'file_deleted': deletion_info['file_deleted'],
-                    'storage_freed': deletion_info['storage_freed']
-                })
-                total_storage_freed += deletion_info['storage_freed']
-            
-            response_data = {
-                'message': f'Successfully deleted {len(deletion_results)} file references',
-                'total_storage_freed': total_storage_freed,
-                'results': deletion_results
-            }
+        reference_ids = bulk_delete_serializer.validated_data['reference_ids']
+        deletion_results, total_storage_freed = (
+            DeduplicationService.handle_bulk_file_deletion(reference_ids)
+        )
+
+        response_data = {
+            'message': f'Successfully deleted {len(deletion_results)} file references',
+            'total_storage_freed': total_storage_freed,
+            'results': deletion_results
+        }
             
-            # Serialize the response
-            response_serializer = BulkDeleteResponseSerializer(response_data)
-            return Response(response_serializer.data, status=status.HTTP_200_OK)
+        # Serialize the response
+        response_serializer = BulkDeleteResponseSerializer(response_data)
+        return Response(response_serializer.data, status=status.HTTP_200_OK)
             
-        except Exception as e:
-            return Response(
-                {'error': f'Bulk deletion failed: {str(e)}'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
 
     @action(detail=False, methods=['get'])
     def search(self, request):
         """
         Advanced search and filtering endpoint
         """
-        # Validate search parameters
+        # Validate search parameters once; the typed values feed the search
         search_serializer = FileSearchSerializer(data=request.query_params)
         search_serializer.is_valid(raise_exception=True)
-        
+
         # Get filtered results
-        queryset = FileSearchService.search_files(request.query_params)
+        queryset = FileSearchService.search_files(search_serializer.validated_data)
         
         # Apply pagination
         page = self.paginate_queryset(queryset)
@@ -172,179 +258,178 @@ class FileReferenceViewSet(viewsets.ModelViewSet):
         """
         Get storage statistics and deduplication savings
         """
-        try:
-            stats = StorageStats.get_stats()
-            serializer = StorageStatsSerializer(stats, context={'request': request})
-            return Response(serializer.data)
-        except Exception as e:
-            return Response(
-                {'error': f'Failed to retrieve stats: {str(e)}'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        stats = StorageStats.get_stats()
+        serializer = StorageStatsSerializer(stats, context={'request': request})
+        return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def detailed_stats(self, request):
         """
         Get detailed storage statistics with breakdown by file type
         """
-        try:
-            # Basic stats
-            stats = StorageStats.get_stats()
-            
-            # File type breakdown
-            file_type_stats = File.objects.values('file_type').annotate(
-                count=Count('id'),
-                total_size=Sum('size'),
-                total_references=Sum('reference_count')
-            ).order_by('-total_size')
-            
-            # Most duplicated files
-            most_duplicated = File.objects.filter(reference_count__gt=1).order_by('-reference_count')[:10]
-            
-            # Recent activity
-            recent_uploads = FileReference.objects.order_by('-uploaded_at')[:10]
-            recent_duplicates = FileReference.objects.filter(is_duplicate=True).order_by('-uploaded_at')[:5]
+        # The whole payload is derived from upload/delete activity, so
+        # serve it from cache under the write-bumped analytics version.
+        # File URLs embed the request host, hence the host in the key.
+        cache_key = analytics_cache_key(f'detailed_stats:{request.get_host()}')
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return Response(cached)
+
+        # Basic stats
+        stats = StorageStats.get_stats()
+
+        # File type breakdown (grouped on the normalized type key)
+        file_type_stats = File.objects.by_file_type()
+
+        # Most duplicated files
+        most_duplicated = File.objects.filter(
+            reference_count__gt=1
+        ).select_related('file_type').order_by('-reference_count')[:10]
             
-            response_data = {
-                'basic_stats': StorageStatsSerializer(stats, context={'request': request}).data,
-                'file_type_breakdown': list(file_type_stats),
-                'most_duplicated_files': FileSerializer(most_duplicated, many=True, context={'request': request}).data,
-                'recent_uploads': FileReferenceSerializer(recent_uploads, many=True, context={'request': request}).data,
-                'recent_duplicates': FileReferenceSerializer(recent_duplicates, many=True, context={'request': request}).data
-            }
+        # Recent activity (eager-join the file rows for the serializer)
+        recent_uploads = FileReference.objects.with_file().order_by('-uploaded_at')[:10]
+        recent_duplicates = FileReference.objects.with_file().filter(
+            is_duplicate=True
+        ).order_by('-uploaded_at')[:5]
             
-            return Response(response_data)
-        except Exception as e:
-            return Response(
-                {'error': f'Failed to retrieve detailed stats: {str(e)}'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        response_data = {
+            'basic_stats': StorageStatsSerializer(stats, context={'request': request}).data,
+            'file_type_breakdown': list(file_type_stats),
+            'most_duplicated_files': FileSerializer(most_duplicated, many=True, context={'request': request}).data,
+            'recent_uploads': FileReferenceSerializer(recent_uploads, many=True, context={'request': request}).data,
+            'recent_duplicates': FileReferenceSerializer(recent_duplicates, many=True, context={'request': request}).data
+        }
+        cache.set(cache_key, response_data, 60)
+
+        return Response(response_data)
 
     @action(detail=False, methods=['get'])
     def file_types(self, request):
         """
         Get list of available file types for filtering
         """
-        try:
-            file_types = File.objects.values_list('file_type', flat=True).distinct().order_by('file_type')
-            return Response(list(file_types))
-        except Exception as e:
-            return Response(
-                {'error': f'Failed to retrieve file types: {str(e)}'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        # Small, slow-changing result set: cache it under the analytics
+        # version so uploads/deletions invalidate it with everything else
+        file_types = cache.get_or_set(
+            analytics_cache_key('file_types'),
+            lambda: list(
+                File.objects.values_list(
+                    'file_type__name', flat=True
+                ).distinct().order_by('file_type__name')
+            ),
+            60
+        )
+        return Response(file_types)
 
     @action(detail=False, methods=['get'])
     def duplicates(self, request):
         """
         Get all duplicate file references
         """
-        try:
-            duplicates = FileReference.objects.filter(is_duplicate=True).select_related('file')
+        duplicates = FileReference.objects.duplicates_only()
             
-            # Apply pagination
-            page = self.paginate_queryset(duplicates)
-            if page is not None:
-                serializer = self.get_serializer(page, many=True)
-                return self.get_paginated_response(serializer.data)
+        # Apply pagination
+        page = self.paginate_queryset(duplicates)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
             
-            serializer = self.get_serializer(duplicates, many=True)
-            return Response(serializer.data)
-        except Exception as e:
-            return Response(
-                {'error': f'Failed to retrieve duplicates: {str(e)}'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        serializer = self.get_serializer(duplicates, many=True)
+        return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def orphaned_files(self, request):
         """
         Get physical files that have no references (should not happen with proper reference counting)
         """
-        try:
-            orphaned = File.objects.filter(reference_count=0)
-            serializer = FileSerializer(orphaned, many=True, context={'request': request})
-            return Response({
-                'count': orphaned.count(),
-                'orphaned_files': serializer.data
-            })
-        except Exception as e:
-            return Response(
-                {'error': f'Failed to retrieve orphaned files: {str(e)}'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        orphaned = File.objects.filter(reference_count=0).select_related('file_type')
+        serializer = FileSerializer(orphaned, many=True, context={'request': request})
+        data = serializer.data  # evaluates the queryset once
+        return Response({
+            'count': len(data),
+            'orphaned_files': data
+        })
 
     @action(detail=True, methods=['get'])
     def duplicate_references(self, request, pk=None):
         """
         Get all references that point to the same physical file as this reference
         """
-        try:
-            file_reference = self.get_object()
-            duplicate_references = FileReference.objects.filter(
-                file=file_reference.file
-            ).exclude(id=file_reference.id)
+        file_reference = self.get_object()
+        duplicate_references = FileReference.objects.with_file().filter(
+            file=file_reference.file
+        ).exclude(id=file_reference.id)
             
-            serializer = self.get_serializer(duplicate_references, many=True)
-            return Response({
-                'total_references': file_reference.file.reference_count,
-                'other_references': serializer.data
-            })
-        except Exception as e:
-            return Response(
-                {'error': f'Failed to retrieve duplicate references: {str(e)}'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        serializer = self.get_serializer(duplicate_references, many=True)
+        return Response({
+            'total_references': file_reference.file.reference_count,
+            'other_references': serializer.data
+        })
 
 class FileViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for viewing physical file information (read-only)
     """
-    queryset = File.objects.all()
+    queryset = File.objects.select_related('file_type').all()
     serializer_class = FileSerializer
     pagination_class = FilePagination
 
+    # Keyset ordering per action - references pages FileReference rows,
+    # most_referenced pages File rows ranked by reference count
+    _cursor_orderings = {
+        'references': ('-uploaded_at', '-id'),
+        'most_referenced': ('-reference_count', '-id'),
+    }
+
+    @property
+    def paginator(self):
+        """Use keyset pagination when the client sends a cursor"""
+        if not hasattr(self, '_paginator'):
+            ordering = self._cursor_orderings.get(self.action)
+            if ordering and 'cursor' in self.request.query_params:
+                cursor_paginator = FileCursorPagination()
+                cursor_paginator.ordering = ordering
+                self._paginator = cursor_paginator
+            else:
+                self._paginator = FilePagination()
+        return self._paginator
+
     @action(detail=True, methods=['get'])
     def references(self, request, pk=None):
         """
         Get all references to a specific physical file
         """
-        try:
-            file_obj = self.get_object()
-            references = file_obj.references.all()
-            
-            # Apply pagination
-            page = self.paginate_queryset(references)
-            if page is not None:
-                serializer = FileReferenceSerializer(page, many=True, context={'request': request})
-                return self.get_paginated_response(serializer.data)
-            
-            serializer = FileReferenceSerializer(references, many=True, context={'request': request})
-            return Response(serializer.data)
-        except Exception as e:
-            return Response(
-                {'error': f'Failed to retrieve file references: {str(e)}'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        # Filter directly on the FK instead of fetching the File row first;
+        # the existence check only runs for the empty-result corner case
+        references = FileReference.objects.filter(
+            file_id=pk
+        ).select_related('file', 'file__file_type')
+
+        # Apply pagination
+        page = self.paginate_queryset(references)
+        if not (page or self.get_queryset().filter(pk=pk).exists()):
+            raise Http404('No file matches the given query.')
+        if page is not None:
+            serializer = FileReferenceSerializer(page, many=True, context={'request': request})
+            return self.get_paginated_response(serializer.data)
+
+        serializer = FileReferenceSerializer(references, many=True, context={'request': request})
+        return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def most_referenced(self, request):
         """
         Get files with the most references (most duplicated)
         """
-        try:
-            most_referenced = File.objects.filter(reference_count__gt=1).order_by('-reference_count')
+        most_referenced = File.objects.filter(
+            reference_count__gt=1
+        ).select_related('file_type').order_by('-reference_count')
             
-            # Apply pagination
-            page = self.paginate_queryset(most_referenced)
-            if page is not None:
-                serializer = self.get_serializer(page, many=True)
-                return self.get_paginated_response(serializer.data)
+        # Apply pagination
+        page = self.paginate_queryset(most_referenced)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
             
-            serializer = self.get_serializer(most_referenced, many=True)
-            return Response(serializer.data)
-        except Exception as e:
-            return Response(
-                {'error': f'Failed to retrieve most referenced files: {str(e)}'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        serializer = self.get_serializer(most_referenced, many=True)
+        return Response(serializer.data)